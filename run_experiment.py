@@ -1,16 +1,19 @@
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 import argparse
+import re
 import sys
 from io import StringIO
+from contextlib import redirect_stdout
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime
 from tqdm import tqdm
 
 from src.requirements_io import load_requirements, Requirement
 from src.rule_based_detector import RuleBasedDetector
-from src.llm_detector import LLMDetector
-from src.evaluation import evaluate
-from src.config import DATA_PATH
+from src.llm_detector import LLMDetector, PROMPT_PROFILES
+from src.evaluation import evaluate, compute_metrics
+from src.config import DATA_PATH, LLM_COMPARE_OPTIONS
 
 
 def run_rule_based(reqs: List[Requirement]) -> List[str]:
@@ -22,16 +25,283 @@ def run_rule_based(reqs: List[Requirement]) -> List[str]:
     return preds
 
 
-def run_llm_based(reqs: List[Requirement]) -> List[str]:
-    llm = LLMDetector()
-    preds: List[str] = []
-    for r in tqdm(reqs, desc="LLM-based detector", unit="req"):
-        result = llm.analyze(r.text)
-        label = result.get("label", "ambiguous").lower()
-        if label not in ("clear", "ambiguous"):
-            label = "ambiguous"
-        preds.append(label)
-    return preds
+def run_llm_based(
+    reqs: List[Requirement],
+    llm: Optional[LLMDetector] = None,
+    desc: str = "LLM-based detector",
+) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Return one (result, usage) pair per requirement; result["label"] is
+    already normalized to "clear" / "ambiguous".
+    """
+    llm = llm or LLMDetector()
+    return [
+        llm.analyze_with_usage(r.text)
+        for r in tqdm(reqs, desc=desc, unit="req")
+    ]
+
+
+def write_comparison_tsv(
+    out_tsv: Path,
+    reqs: List[Requirement],
+    rb_preds: List[str],
+    llm_preds: List[str],
+) -> None:
+    with out_tsv.open("w", encoding="utf-8") as f:
+        f.write("id\ttext\tgold\trule_based\tllm\n")
+        for r, rb, llm in zip(reqs, rb_preds, llm_preds):
+            f.write(f"{r.id}\t{r.text}\t{r.label}\t{rb}\t{llm}\n")
+
+
+def _safe_name(name: str) -> str:
+    # Model tags such as "llama3.1:8b" are not valid folder names everywhere
+    return re.sub(r"[^A-Za-z0-9._-]+", "-", name)
+
+
+def _failed_call(exc: Exception) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    # "error" label keeps the call out of the metrics; zero usage so the
+    # failure does not skew latency or token totals
+    result = {"label": "error", "reason": f"LLM call failed: {exc}", "rewrite": None}
+    usage = {
+        "latency_s": 0.0,
+        "load_duration_s": 0.0,
+        "prompt_eval_count": 0,
+        "prompt_eval_duration_s": 0.0,
+        "eval_count": 0,
+        "failed": True,
+    }
+    return result, usage
+
+
+def run_sweep(
+    csv_paths: List[Path],
+    models: List[str],
+    prompts: List[str],
+    workers: int,
+) -> None:
+    """
+    Evaluate every (CSV, model, prompt) cell of the grid.
+
+    All LLM calls go through one ThreadPoolExecutor capped at `workers`.
+    Work is de-duplicated across cells: the rule-based detector runs once per
+    distinct requirement text, and each (model, prompt, text) triple is sent
+    to Ollama only once, no matter how many CSVs contain that text.
+
+    A failed call (HTTP error, timeout, unknown model) is recorded with the
+    label "error" and counted in the `failed_calls` column, so the remaining
+    cells still produce their results. LLM metrics are computed over the
+    successful calls only (`llm_scored`), and are nan when none succeeded.
+    """
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    root_dir = Path("experiment_results")
+
+    datasets: Dict[Path, List[Requirement]] = {
+        p: load_requirements(p) for p in csv_paths
+    }
+    texts = sorted({r.text for reqs in datasets.values() for r in reqs})
+
+    # Rule pass: once per unique text
+    rb = RuleBasedDetector()
+    rb_labels: Dict[str, str] = {}
+    for text in tqdm(texts, desc="Rule-based detector", unit="req"):
+        rb_labels[text] = "ambiguous" if rb.analyze(text)["has_issue"] else "clear"
+
+    # LLM pass: once per unique (model, prompt, text)
+    detectors = {
+        (m, p): LLMDetector(model_name=m, prompt=p) for m in models for p in prompts
+    }
+    llm_results: Dict[Tuple[str, str, str], Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+    failures: Dict[Tuple[str, str], List[str]] = {}
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures: Dict[Future, Tuple[str, str, str]] = {
+            executor.submit(det.analyze_with_usage, text): (m, p, text)
+            for (m, p), det in detectors.items()
+            for text in texts
+        }
+        for fut in tqdm(
+            as_completed(futures), total=len(futures),
+            desc="LLM-based detector", unit="call",
+        ):
+            m, p, text = futures[fut]
+            try:
+                llm_results[(m, p, text)] = fut.result()
+            except Exception as exc:
+                failures.setdefault((m, p), []).append(str(exc))
+                llm_results[(m, p, text)] = _failed_call(exc)
+    except BaseException:
+        # Ctrl-C or an unexpected error: drop queued calls instead of letting
+        # shutdown(wait=True) run them all; only in-flight calls finish
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+
+    for (m, p), errors in failures.items():
+        print(f"WARNING: {len(errors)} LLM call(s) failed for model={m} "
+              f"prompt={p}; first error: {errors[0]}", file=sys.stderr)
+
+    # Per-cell outputs + consolidated table
+    sweep_dir = root_dir / "sweep" / timestamp
+    sweep_dir.mkdir(parents=True, exist_ok=True)
+    metrics_tsv = sweep_dir / "sweep_metrics.tsv"
+
+    rows: List[str] = []
+    for csv_path, reqs in datasets.items():
+        rb_preds = [rb_labels[r.text] for r in reqs]
+        rb_metrics = compute_metrics(reqs, rb_preds)
+        for m in models:
+            for p in prompts:
+                cell = [llm_results[(m, p, r.text)] for r in reqs]
+                llm_preds = [result["label"] for result, _ in cell]
+                usages = [usage for _, usage in cell]
+                scored = [
+                    (r, label) for r, label, u in zip(reqs, llm_preds, usages)
+                    if not u.get("failed")
+                ]
+                scored_reqs = [r for r, _ in scored]
+                scored_preds = [label for _, label in scored]
+                if scored:
+                    llm_metrics = compute_metrics(scored_reqs, scored_preds)
+                else:
+                    llm_metrics = dict.fromkeys(("precision", "recall", "f1"), float("nan"))
+
+                cell_dir = (
+                    root_dir / csv_path.stem / timestamp
+                    / f"{_safe_name(m)}__{_safe_name(p)}"
+                )
+                cell_dir.mkdir(parents=True, exist_ok=True)
+                out_tsv = cell_dir / "results_comparison.tsv"
+                write_comparison_tsv(out_tsv, reqs, rb_preds, llm_preds)
+
+                console_capture = StringIO()
+                with redirect_stdout(console_capture):
+                    print(f"Running experiment on: {csv_path}")
+                    print(f"Model: {m}  Prompt: {p}\n")
+                    evaluate("Rule-Based Baseline (QuARS-style)", reqs, rb_preds)
+                    print("\n")
+                    if len(scored) < len(reqs):
+                        print(f"{len(reqs) - len(scored)} LLM call(s) failed; "
+                              f"scoring the {len(scored)} successful call(s) only.\n")
+                    if scored:
+                        evaluate("LLM-Based Detector", scored_reqs, scored_preds)
+                    else:
+                        print("=== LLM-Based Detector ===")
+                        print("No successful LLM calls; metrics not computed.")
+                log_path = cell_dir / f"results_{csv_path.stem}.txt"
+                log_path.write_text(console_capture.getvalue(), encoding="utf-8")
+
+                total_latency = sum(u["latency_s"] for u in usages)
+                prompt_eval_s = sum(u["prompt_eval_duration_s"] for u in usages)
+                prompt_eval_tokens = sum(u["prompt_eval_count"] for u in usages)
+                completion_tokens = sum(u["eval_count"] for u in usages)
+                failed_calls = sum(1 for u in usages if u.get("failed"))
+                rows.append(
+                    f"{csv_path.stem}\t{m}\t{p}\t{len(reqs)}"
+                    f"\t{rb_metrics['f1']:.3f}"
+                    f"\t{len(scored)}"
+                    f"\t{llm_metrics['precision']:.3f}"
+                    f"\t{llm_metrics['recall']:.3f}"
+                    f"\t{llm_metrics['f1']:.3f}"
+                    f"\t{total_latency / max(len(reqs) - failed_calls, 1):.3f}"
+                    f"\t{total_latency:.3f}"
+                    f"\t{prompt_eval_s:.3f}"
+                    f"\t{prompt_eval_tokens}\t{completion_tokens}"
+                    f"\t{prompt_eval_tokens + completion_tokens}"
+                    f"\t{failed_calls}"
+                )
+
+    header = (
+        "csv\tmodel\tprompt\tn\trule_f1\tllm_scored\tllm_precision\tllm_recall\tllm_f1"
+        "\tmean_latency_s\ttotal_latency_s\tprompt_eval_s\tprompt_eval_tokens"
+        "\tcompletion_tokens\tevaluated_tokens\tfailed_calls"
+    )
+    table = "\n".join([header] + rows) + "\n"
+    metrics_tsv.write_text(table, encoding="utf-8")
+
+    print(table)
+    print(f"Unique LLM calls: {len(llm_results)} "
+          f"({len(models) * len(prompts)} model/prompt pairs x {len(texts)} texts)")
+    print(f"Consolidated metrics saved to: {metrics_tsv}")
+
+
+def run_prompt_comparison(
+    reqs: List[Requirement],
+    model: str,
+    out_tsv: Path,
+    baseline: str = "default",
+    candidate: str = "compact",
+    known: Optional[Dict[str, List[Tuple[Dict[str, Any], Dict[str, Any]]]]] = None,
+) -> None:
+    """
+    Compare two prompt profiles on the same requirements and model.
+
+    Calls run sequentially, one profile at a time, so each profile's static
+    prefix stays in Ollama's cache between its calls (interleaving profiles or
+    running them concurrently would evict it). latency_s excludes Ollama's
+    load_duration, so whichever profile runs first is not charged for loading
+    the model. Per-call prompt_eval_count, prompt_eval_duration and
+    load_duration are written to `out_tsv`; the latency saved and the F1
+    change are printed. Both profiles use LLM_COMPARE_OPTIONS (temperature 0,
+    fixed seed), so the F1 change reflects the prompt, not sampling noise.
+
+    `known` maps a profile to (result, usage) pairs already collected for
+    this model with the same options, e.g. by the main LLM pass; those
+    profiles are not re-run.
+    """
+    known = known or {}
+    per_profile: Dict[str, List[Tuple[Dict[str, Any], Dict[str, Any]]]] = {}
+    for profile in (baseline, candidate):
+        if profile in known:
+            per_profile[profile] = known[profile]
+        else:
+            per_profile[profile] = run_llm_based(
+                reqs,
+                LLMDetector(model_name=model, prompt=profile, options=LLM_COMPARE_OPTIONS),
+                desc=f"LLM ({profile} prompt)",
+            )
+
+    with out_tsv.open("w", encoding="utf-8") as f:
+        f.write("id\tprofile\tgold\tllm\tlatency_s\tload_duration_s"
+                "\tprompt_eval_count\tprompt_eval_duration_s\n")
+        for profile, cell in per_profile.items():
+            for r, (result, usage) in zip(reqs, cell):
+                f.write(
+                    f"{r.id}\t{profile}\t{r.label}\t{result['label']}"
+                    f"\t{usage['latency_s']:.4f}"
+                    f"\t{usage['load_duration_s']:.4f}"
+                    f"\t{usage['prompt_eval_count']}"
+                    f"\t{usage['prompt_eval_duration_s']:.4f}\n"
+                )
+
+    n = max(len(reqs), 1)
+    summary: Dict[str, Dict[str, float]] = {}
+    print(f"=== Prompt comparison ({model}): {baseline} vs {candidate} ===")
+    print(f"Sampling options: {LLM_COMPARE_OPTIONS}")
+    print(f"{'profile':<10} {'F1':>6} {'latency_s':>10} "
+          f"{'prompt_eval_s':>14} {'prompt_eval_tokens':>18} {'load_s':>8}"
+          "  (mean per call; latency excludes load)")
+    for profile, cell in per_profile.items():
+        usages = [usage for _, usage in cell]
+        summary[profile] = {
+            "f1": compute_metrics(reqs, [result["label"] for result, _ in cell])["f1"],
+            "latency_s": sum(u["latency_s"] for u in usages) / n,
+            "prompt_eval_s": sum(u["prompt_eval_duration_s"] for u in usages) / n,
+            "prompt_eval_tokens": sum(u["prompt_eval_count"] for u in usages) / n,
+            "load_s": sum(u["load_duration_s"] for u in usages) / n,
+        }
+        row = summary[profile]
+        print(f"{profile:<10} {row['f1']:>6.3f} {row['latency_s']:>10.3f} "
+              f"{row['prompt_eval_s']:>14.3f} {row['prompt_eval_tokens']:>18.1f}"
+              f" {row['load_s']:>8.3f}")
+
+    base, cand = summary[baseline], summary[candidate]
+    saved = base["latency_s"] - cand["latency_s"]
+    pct = 100 * saved / base["latency_s"] if base["latency_s"] else 0.0
+    print(f"\nLatency saved per call: {saved:.3f} s ({pct:.1f}%)")
+    print(f"Prompt eval saved per call: "
+          f"{base['prompt_eval_s'] - cand['prompt_eval_s']:.3f} s")
+    print(f"F1 change ({candidate} - {baseline}): {cand['f1'] - base['f1']:+.3f}")
+    print(f"Per-call prompt stats written to: {out_tsv}")
 
 
 def parse_args() -> argparse.Namespace:
@@ -44,12 +314,94 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Path to the CSV file with labeled requirements."
     )
+    parser.add_argument(
+        "--sweep",
+        action="store_true",
+        help="Evaluate every combination of --csvs, --models and --prompts.",
+    )
+    parser.add_argument(
+        "--csvs",
+        nargs="+",
+        default=None,
+        help="Sweep mode: labeled CSV files (default: the positional csv).",
+    )
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        default=["llama3.1"],
+        help="Ollama model names (default: llama3.1). The main LLM pass uses the "
+             "first; --sweep and --compare-prompts use all of them.",
+    )
+    parser.add_argument(
+        "--prompts",
+        nargs="+",
+        choices=list(PROMPT_PROFILES),
+        default=None,
+        help="Sweep mode: prompt profiles (default: default).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Sweep mode: max concurrent LLM calls (default: 4).",
+    )
+    parser.add_argument(
+        "--compare-prompts",
+        action="store_true",
+        help="Also compare the default and compact prompt profiles for each "
+             "of --models (latency, prompt eval and F1).",
+    )
     return parser.parse_args()
 
 
 def main():
     args = parse_args()
 
+    if args.sweep and args.compare_prompts:
+        raise SystemExit("--compare-prompts cannot be combined with --sweep")
+
+    sweep_only = [
+        flag for flag, value in (
+            ("--csvs", args.csvs), ("--prompts", args.prompts), ("--workers", args.workers),
+        )
+        if value is not None
+    ]
+    if sweep_only and not args.sweep:
+        raise SystemExit(f"{', '.join(sweep_only)} only apply with --sweep")
+
+    if len(set(args.models)) > 1 and not (args.sweep or args.compare_prompts):
+        raise SystemExit("several --models need --sweep or --compare-prompts")
+
+    if args.sweep:
+        prompts = args.prompts or ["default"]
+        workers = 4 if args.workers is None else args.workers
+        csv_paths = [Path(c) for c in args.csvs] if args.csvs else [
+            Path(args.csv) if args.csv else DATA_PATH
+        ]
+        for p in csv_paths:
+            if not p.exists():
+                raise SystemExit(f"Labeled data file not found: {p}")
+        if workers < 1:
+            raise SystemExit("--workers must be at least 1")
+        # dict.fromkeys drops repeated grid values but keeps their order
+        csv_paths = list(dict.fromkeys(csv_paths))
+        # Cell folders and the `csv` column are keyed by file name only
+        stems: Dict[str, Path] = {}
+        for p in csv_paths:
+            if p.stem in stems:
+                raise SystemExit(
+                    f"CSV files {stems[p.stem]} and {p} share the name "
+                    f"{p.stem!r}; their sweep results would overwrite each other"
+                )
+            stems[p.stem] = p
+        run_sweep(
+            csv_paths,
+            list(dict.fromkeys(args.models)),
+            list(dict.fromkeys(prompts)),
+            workers,
+        )
+        return
+
     csv_path = Path(args.csv) if args.csv else DATA_PATH
     if not csv_path.exists():
         raise SystemExit(f"Labeled data file not found: {csv_path}")
@@ -81,19 +433,33 @@ def main():
     print("\n")
 
     # LLM-based evaluation
-    llm_preds = run_llm_based(requirements)
+    # With --compare-prompts, use the comparison's sampling options so this
+    # pass can be reused for the matching profile
+    llm = LLMDetector(
+        model_name=args.models[0],
+        options=LLM_COMPARE_OPTIONS if args.compare_prompts else None,
+    )
+    llm_calls = run_llm_based(requirements, llm)
+    llm_preds = [result["label"] for result, _ in llm_calls]
     evaluate("LLM-Based Detector", requirements, llm_preds)
     print("\n")
 
     # TSV output
     out_tsv = run_dir / "results_comparison.tsv"
-    with out_tsv.open("w", encoding="utf-8") as f:
-        f.write("id\ttext\tgold\trule_based\tllm\n")
-        for r, rb, llm in zip(requirements, rb_preds, llm_preds):
-            f.write(f"{r.id}\t{r.text}\t{r.label}\t{rb}\t{llm}\n")
+    write_comparison_tsv(out_tsv, requirements, rb_preds, llm_preds)
 
     print(f"Per-requirement comparison written to: {out_tsv}\n")
 
+    # Prompt profile comparison (default vs compact)
+    if args.compare_prompts:
+        for model in dict.fromkeys(args.models):
+            prompt_tsv = run_dir / f"prompt_comparison_{_safe_name(model)}.tsv"
+            # Reuse the main LLM pass when it already covers this model/profile
+            # (it ran with the same sampling options)
+            known = {llm.prompt: llm_calls} if model == llm.model_name else {}
+            run_prompt_comparison(requirements, model, prompt_tsv, known=known)
+            print("\n")
+
     # Restore stdout
     sys.stdout = real_stdout
 
@@ -3,6 +3,16 @@ from pathlib import Path
 # Path to labeled dataset for experiments
 DATA_PATH = Path('data/mixed_requirements.csv')
 
+# Prompt profile used by the LLM detector ('default' or 'compact', see llm_detector.PROMPT_PROFILES)
+LLM_PROMPT_PROFILE = 'default'
+
+# Seconds to wait for a single Ollama response before giving up
+LLM_TIMEOUT_S = 120
+
+# Ollama sampling options for --compare-prompts: greedy decoding with a fixed
+# seed, so F1 differences come from the prompt rather than sampling noise
+LLM_COMPARE_OPTIONS = {'temperature': 0, 'seed': 42}
+
 # Terms for QuARS-style rule-based ambiguity detection
 AMBIGUOUS_TERMS = [
     'adequate', 'as needed', 'better', 'could', 'easy to use', 'efficient', 'etc.',
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List
 from sklearn.metrics import precision_recall_fscore_support, classification_report
 from .requirements_io import Requirement
 
@@ -13,21 +13,33 @@ def encode_preds(labels: List[str]) -> List[int]:
     return [LABEL_TO_INT[l] for l in labels]
 
 
+def compute_metrics(
+    gold: List[Requirement],
+    predicted_labels: List[str],
+) -> Dict[str, float]:
+    """
+    Precision / recall / F1 for the "ambiguous" class, without printing.
+    """
+    precision, recall, f1, _ = precision_recall_fscore_support(
+        encode_labels(gold), encode_preds(predicted_labels),
+        average="binary", pos_label=1, zero_division=0,
+    )
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
 def evaluate(
     name: str,
     gold: List[Requirement],
     predicted_labels: List[str],
 ) -> None:
-    y_true = encode_labels(gold)
-    y_pred = encode_preds(predicted_labels)
-
-    precision, recall, f1, _ = precision_recall_fscore_support(
-        y_true, y_pred, average="binary", pos_label=1
-    )
+    metrics = compute_metrics(gold, predicted_labels)
 
     print(f"=== {name} ===")
-    print(f"Precision (ambiguous): {precision:.3f}")
-    print(f"Recall    (ambiguous): {recall:.3f}")
-    print(f"F1        (ambiguous): {f1:.3f}")
+    print(f"Precision (ambiguous): {metrics['precision']:.3f}")
+    print(f"Recall    (ambiguous): {metrics['recall']:.3f}")
+    print(f"F1        (ambiguous): {metrics['f1']:.3f}")
     print("\nDetailed report:")
-    print(classification_report(y_true, y_pred, target_names=["clear", "ambiguous"]))
+    print(classification_report(
+        encode_labels(gold), encode_preds(predicted_labels),
+        labels=[0, 1], target_names=["clear", "ambiguous"], zero_division=0,
+    ))
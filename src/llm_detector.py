@@ -1,7 +1,10 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 import json
+import time
 import requests
 
+from .config import LLM_PROMPT_PROFILE, LLM_TIMEOUT_S
+
 LLM_SYSTEM_PROMPT = """
 You are an expert requirements engineer.
 
@@ -29,9 +32,38 @@ Requirement:
 Respond ONLY with the JSON object described above.
 """
 
+# Compact profile. Both profiles start with a static system prompt that Ollama
+# can serve from its prefix cache; the default user message also has a fixed
+# 'Requirement:\n"' head, so its per-call suffix is the text plus one trailing
+# sentence. Compact shortens the static prefix and sends the bare requirement
+# as the user message, dropping that wrapper. Any saving comes from those two
+# changes, not from enabling prefix reuse.
+LLM_COMPACT_SYSTEM_PROMPT = (
+    "You are a requirements engineer. Classify the requirement in the next "
+    "message as clear or ambiguous. Reply ONLY with JSON: "
+    '{"label": "clear"|"ambiguous", "reason": string, "rewrite": string|null}. '
+    "If ambiguous, rewrite it with measurable, testable language (thresholds, "
+    "units) keeping the intent; if clear, rewrite is null."
+)
+
+LLM_COMPACT_USER_TEMPLATE = "{text}"
+
+# Named (system prompt, user template) pairs selectable via LLMDetector(prompt=...)
+PROMPT_PROFILES: Dict[str, Tuple[str, str]] = {
+    "default": (LLM_SYSTEM_PROMPT, LLM_USER_TEMPLATE),
+    "compact": (LLM_COMPACT_SYSTEM_PROMPT, LLM_COMPACT_USER_TEMPLATE),
+}
+
 
 class LLMDetector:
-    def __init__(self, model_name: str = "llama3.1", base_url: str = "http://localhost:11434"):
+    def __init__(
+        self,
+        model_name: str = "llama3.1",
+        base_url: str = "http://localhost:11434",
+        prompt: str = LLM_PROMPT_PROFILE,
+        timeout: float = LLM_TIMEOUT_S,
+        options: Optional[Dict[str, Any]] = None,
+    ):
         """
         Local FREE detector powered by Ollama.
 
@@ -39,27 +71,66 @@ class LLMDetector:
           - Ollama installed (https://ollama.com)
           - Ollama server running:    `ollama serve`
           - Model pulled, e.g.:       `ollama pull llama3.1`
+
+        `prompt` selects one of the PROMPT_PROFILES; `timeout` (seconds)
+        bounds each Ollama request; `options` (e.g. temperature, seed) is
+        passed through to Ollama, which uses the model defaults if unset.
         """
+        if prompt not in PROMPT_PROFILES:
+            raise ValueError(
+                f"Unknown prompt profile {prompt!r}; "
+                f"choose from {', '.join(PROMPT_PROFILES)}"
+            )
         self.model_name = model_name
         self.base_url = base_url.rstrip("/")
         self.chat_url = f"{self.base_url}/api/chat"
+        self.prompt = prompt
+        self.timeout = timeout
+        self.options = options
+        self.system_prompt, self.user_template = PROMPT_PROFILES[prompt]
 
-    def _call_llm_raw(self, text: str) -> str:
+    def _call_llm(self, text: str) -> Tuple[str, Dict[str, Any]]:
         """
-        Call Ollama chat API and return raw text response.
+        Call Ollama chat API and return (raw text response, usage).
+
+        usage = {
+          "latency_s": server-side total duration (wall clock if not
+                       reported) minus model load time,
+          "load_duration_s": time spent loading the model for this call,
+          "prompt_eval_count": prompt tokens evaluated (cached prefix excluded),
+          "prompt_eval_duration_s": time spent evaluating the prompt,
+          "eval_count": tokens generated,
+        }
         """
         payload = {
             "model": self.model_name,
             "messages": [
-                {"role": "system", "content": LLM_SYSTEM_PROMPT},
-                {"role": "user", "content": LLM_USER_TEMPLATE.format(text=text)},
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": self.user_template.format(text=text)},
             ],
             "stream": False,
         }
+        if self.options:
+            payload["options"] = self.options
 
-        resp = requests.post(self.chat_url, json=payload)
+        start = time.perf_counter()
+        resp = requests.post(self.chat_url, json=payload, timeout=self.timeout)
         resp.raise_for_status()
         data = resp.json()
+        wall_s = time.perf_counter() - start
+
+        # Ollama reports durations in nanoseconds
+        # Model load time is excluded from latency_s: it depends on which model
+        # ran before, not on the prompt, and would bias prompt comparisons
+        total_ns = data.get("total_duration")
+        load_ns = data.get("load_duration", 0) or 0
+        usage = {
+            "latency_s": (total_ns / 1e9 if total_ns else wall_s) - load_ns / 1e9,
+            "load_duration_s": load_ns / 1e9,
+            "prompt_eval_count": int(data.get("prompt_eval_count", 0) or 0),
+            "prompt_eval_duration_s": (data.get("prompt_eval_duration", 0) or 0) / 1e9,
+            "eval_count": int(data.get("eval_count", 0) or 0),
+        }
 
         # Ollama chat API returns:
         # { "message": { "role": "...", "content": "..." }, ... }
@@ -67,7 +138,13 @@ class LLMDetector:
         if not raw:
             # fallback if something weird happens
             raw = "{}"
-        return raw
+        return raw, usage
+
+    def _call_llm_raw(self, text: str) -> str:
+        """
+        Call Ollama chat API and return raw text response.
+        """
+        return self._call_llm(text)[0]
 
     def _parse_json(self, raw: str) -> Dict[str, Any]:
         raw = raw.strip()
@@ -110,8 +187,15 @@ class LLMDetector:
           "rewrite": "..." or None
         }
         """
-        raw = self._call_llm_raw(text)
-        return self._parse_json(raw)
+        return self.analyze_with_usage(text)[0]
+
+    def analyze_with_usage(self, text: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Like analyze(), but also return the per-call usage dict
+        (latency and token counts) reported by Ollama.
+        """
+        raw, usage = self._call_llm(text)
+        return self._parse_json(raw), usage
 
     def rewrite_only(self, text: str) -> str:
         """